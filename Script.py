@@ -1,20 +1,122 @@
 import os
+import re
 import json
+import functools
+import asyncio
+import queue
 import sqlite3
+import threading
 import time
+from collections import Counter
 from typing import List, Dict, Tuple, Optional
-import pandas as pd
+import httpx
 from dotenv import load_dotenv
-from openai import OpenAI
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import SystemMessage, HumanMessage
-from langchain.chains import LLMChain
-from langchain.memory import ConversationBufferMemory
+from openai import AsyncOpenAI, ContentFilterFinishReasonError, LengthFinishReasonError, pydantic_function_tool
+from pydantic import BaseModel, Field
 
 # Load environment variables
 load_dotenv()
 
+# Statements run on every session, kept as constants so sqlite3 reuses their compiled form
+_INSERT_SESSION_SQL = '''
+INSERT INTO sessions (user_id, target_language, native_language, proficiency_level, scene)
+VALUES (?, ?, ?, ?, ?)
+'''
+
+_UPDATE_SESSION_END_SQL = '''
+UPDATE sessions
+SET end_time = CURRENT_TIMESTAMP
+WHERE id = ?
+'''
+
+_INSERT_MISTAKE_SQL = '''
+INSERT INTO mistakes (session_id, mistake_text, correction, mistake_type, importance, count)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (session_id, mistake_text, correction, mistake_type) DO UPDATE
+SET count = count + excluded.count, importance = MAX(importance, excluded.importance)
+'''
+
+# Start of the reply string inside the streamed tutor_turn arguments
+_REPLY_START = re.compile(r'"reply"\s*:\s*"')
+
+
+def _partial_reply(arguments: str) -> str:
+    """Decode as much of the reply as has arrived in partial tutor_turn arguments."""
+    match = _REPLY_START.search(arguments)
+    if match is None:
+        return ""
+
+    # Stop before the closing quote or an escape sequence that is still incomplete
+    raw = arguments[match.end():]
+    end = i = 0
+    while i < len(raw) and raw[i] != '"':
+        i += (6 if raw[i + 1:i + 2] == "u" else 2) if raw[i] == "\\" else 1
+        if i > len(raw):
+            break
+        end = i
+
+    reply = json.loads('"' + raw[:end] + '"')
+    # Hold back half of a surrogate pair until the other half arrives
+    if reply and "\ud800" <= reply[-1] <= "\udbff":
+        reply = reply[:-1]
+    return reply
+
+
+@functools.lru_cache(maxsize=256)
+def _build_scene_prompt(scene_description: str, target_language: str,
+                        native_language: str, proficiency_level: str) -> str:
+    """Build the scene system prompt, shared by every bot with the same scene and preferences."""
+    return f"""
+    You are an AI language tutor helping someone learn {target_language}. 
+    Their native language is {native_language} and their level is {proficiency_level}.
+
+    Scene: {scene_description}
+
+    You will play the role of a native {target_language} speaker in this scene.
+
+    Guidelines:
+    1. Primarily use {target_language}, but adapt your language complexity to their {proficiency_level} level.
+    2. For beginner: Use simple phrases, speak slowly, and provide translations to {native_language} when needed.
+    3. For intermediate: Use everyday language, occasionally provide translations for difficult words.
+    4. For advanced: Use natural, native-like speech with occasional challenging vocabulary.
+    5. Keep your replies conversational and appropriate to the scene. Do not include corrections in your reply, they are shown to the user separately.
+    6. Track the user's common mistakes and areas for improvement.
+    7. Be patient, encouraging, and make the conversation natural and engaging.
+    8. Start the conversation naturally as if you are in the scene described.
+
+    Analyze every message from the user for mistakes with grammar, vocabulary, sentence structure, or idioms.
+    For each mistake, provide:
+    1. The incorrect text
+    2. The corrected version
+    3. A brief explanation of the rule or why it's incorrect
+    4. The type of mistake (grammar, vocabulary, structure, idiom, etc.)
+    5. Importance (1-3, where 3 is a critical mistake)
+
+    If there are no mistakes, return an empty array for mistakes.
+    Return your reply and the analysis by calling the tutor_turn function.
+
+    Begin the conversation in {target_language}, introducing yourself according to the scene and asking a question to engage the user.
+    """
+
+
+class Mistake(BaseModel):
+    """A mistake found in the user's message."""
+    incorrect: str
+    correction: str
+    explanation: str
+    type: str
+    importance: int = Field(ge=1, le=3)  # 3 is a critical mistake
+
+
+class TutorTurn(BaseModel):
+    """Reply to the learner and report the mistakes in their message."""
+    reply: str
+    mistakes: List[Mistake]
+    overall_quality: int = Field(ge=1, le=5)  # Rating of the user's message
+    strengths: List[str]
+    improvement_areas: List[str]
+
+
 class LanguageLearningBot:
     """A chatbot that helps users learn languages through immersive conversation."""
 
@@ -33,37 +135,88 @@ class LanguageLearningBot:
     # Available language levels
     LEVELS = ["beginner", "intermediate", "advanced"]
 
+    # Filler messages that are answered without analyzing them for mistakes
+    GREETINGS = frozenset({
+        "hi", "hello", "hey", "ok", "okay", "yes", "no", "thanks", "thank you",
+        "hola", "sí", "si", "vale", "gracias", "adiós",
+        "bonjour", "salut", "oui", "non", "merci",
+        "hallo", "ja", "nein", "danke",
+        "ciao", "grazie", "olá", "sim", "não", "obrigado", "obrigada"
+    })
+
+    # Most mistakes kept from a single turn, the most important ones first
+    MAX_MISTAKES_PER_TURN = 5
+
+    # Function the model calls to return its reply together with the mistake analysis
+    TUTOR_TURN_TOOL = pydantic_function_tool(TutorTurn, name="tutor_turn")
+
     def __init__(self, db_path: str = "language_learning.db"):
         """Initialize the bot with a database connection and OpenAI client."""
-        # Initialize OpenAI client
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-        # Initialize LangChain components
-        self.chat_model = ChatOpenAI(
-            temperature=0.7,
-            model="gpt-4o"
+        # Initialize OpenAI client on a pooled HTTP/2 transport so connections are reused across calls
+        self.client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=60)
+            )
         )
 
-        # Setup database
+        # Event loop that drives the async OpenAI calls for the whole session
+        self.loop = asyncio.new_event_loop()
+
+        # Summarizing older turns is a plain extraction task, so a smaller model is enough
+        self.summary_model = "gpt-4o-mini"
+
+        # Setup database (a single connection is reused for the whole session)
         self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
         self.setup_database()
 
+        # Mistakes are written by a background thread so the conversation never waits on the database
+        self._db_q = queue.Queue()
+        self._db_thread = threading.Thread(target=self._db_worker, daemon=True)
+        self._db_thread.start()
+
         # Session data
         self.user_id = None
         self.target_language = None
         self.native_language = None
         self.proficiency_level = None
         self.selected_scene = None
+        self._scene_system_prompt = None
         self.session_id = None
         self.mistakes = []
 
-        # Conversation memory
-        self.memory = ConversationBufferMemory(return_messages=True)
+        # Unique mistakes of the session keyed by (mistake_text, correction, mistake_type), used for the summary
+        self._mistake_counter: Dict[Tuple[str, str, str], Dict] = {}
+
+        # Conversation memory, built on first use
+        self._memory = None
+
+    @property
+    def memory(self):
+        """Conversation memory (older turns are summarized so the context stays bounded)."""
+        # LangChain is slow to import, so it is only loaded once the conversation starts
+        if self._memory is None:
+            from langchain_openai import ChatOpenAI
+            from langchain.memory import ConversationSummaryBufferMemory
+
+            self._memory = ConversationSummaryBufferMemory(
+                llm=ChatOpenAI(temperature=0, model=self.summary_model),
+                max_token_limit=400,
+                memory_key="chat_history",
+                return_messages=True
+            )
+        return self._memory
 
     def setup_database(self):
         """Set up the SQLite database with necessary tables."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
+
+        # WAL journaling lets each commit append to the log instead of syncing the main file
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
 
         # Create users table
         cursor.execute('''
@@ -97,65 +250,102 @@ class LanguageLearningBot:
             correction TEXT,
             mistake_type TEXT,
             importance INTEGER,
+            count INTEGER DEFAULT 1,
             FOREIGN KEY (session_id) REFERENCES sessions (id)
         )
         ''')
 
-        conn.commit()
-        conn.close()
+        # Databases created before repeated mistakes were merged have no count column.
+        # The migration runs in one transaction so a crash cannot leave the column without the merge.
+        cursor.execute("BEGIN IMMEDIATE")
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(mistakes)")]
+        if "count" not in columns:
+            cursor.execute("ALTER TABLE mistakes ADD COLUMN count INTEGER DEFAULT 1")
+
+            # Merge existing duplicate rows so the unique index below can be created
+            cursor.execute('''
+            UPDATE mistakes
+            SET (count, importance) = (
+                SELECT COUNT(*), MAX(m.importance) FROM mistakes AS m
+                WHERE m.session_id IS mistakes.session_id
+                AND m.mistake_text IS mistakes.mistake_text
+                AND m.correction IS mistakes.correction
+                AND m.mistake_type IS mistakes.mistake_type
+            )
+            ''')
+            cursor.execute('''
+            DELETE FROM mistakes
+            WHERE id NOT IN (
+                SELECT MIN(id) FROM mistakes
+                GROUP BY session_id, mistake_text, correction, mistake_type
+            )
+            ''')
+        cursor.execute("COMMIT")
+
+        # Indexes for per-session and per-user lookups (idx_mistakes_unique also covers session_id filters)
+        cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_mistakes_unique
+        ON mistakes (session_id, mistake_text, correction, mistake_type)
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_mistakes_importance ON mistakes (session_id, importance DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id)")
 
     def create_user(self) -> int:
         """Create a new user in the database and return the user ID."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
         cursor.execute("INSERT INTO users DEFAULT VALUES")
-        user_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return user_id
+        return cursor.lastrowid
 
     def start_session(self) -> int:
         """Start a new learning session and return the session ID."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-        INSERT INTO sessions (user_id, target_language, native_language, proficiency_level, scene)
-        VALUES (?, ?, ?, ?, ?)
-        ''', (self.user_id, self.target_language, self.native_language, self.proficiency_level, self.selected_scene))
-        session_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return session_id
+        cursor = self.conn.cursor()
+        cursor.execute(_INSERT_SESSION_SQL, (self.user_id, self.target_language, self.native_language, self.proficiency_level, self.selected_scene))
+        return cursor.lastrowid
 
     def end_session(self):
-        """End the current learning session."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-        UPDATE sessions 
-        SET end_time = CURRENT_TIMESTAMP
-        WHERE id = ?
-        ''', (self.session_id,))
-        conn.commit()
-        conn.close()
-
-    def record_mistake(self, mistake_text: str, correction: str, mistake_type: str, importance: int = 1):
-        """Record a user mistake in the database."""
-        self.mistakes.append({
-            "mistake_text": mistake_text,
-            "correction": correction,
-            "mistake_type": mistake_type,
-            "importance": importance
-        })
-
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-        INSERT INTO mistakes (session_id, mistake_text, correction, mistake_type, importance)
-        VALUES (?, ?, ?, ?, ?)
-        ''', (self.session_id, mistake_text, correction, mistake_type, importance))
-        conn.commit()
-        conn.close()
+        """End the current learning session and close the database connection."""
+        # Let the background thread write the remaining mistakes before the connection is closed
+        self._db_q.put(None)
+        self._db_thread.join()
+
+        cursor = self.conn.cursor()
+        cursor.execute(_UPDATE_SESSION_END_SQL, (self.session_id,))
+        self.conn.close()
+
+    def record_mistakes(self, rows: List[Tuple[int, str, str, str, int, int]]):
+        """Record a batch of unique user mistakes, adding to the count of rows already stored."""
+        if not rows:
+            return
+
+        cursor = self.conn.cursor()
+        cursor.executemany(_INSERT_MISTAKE_SQL, rows)
+
+    def _db_worker(self):
+        """Write queued batches of mistakes to the database until None is queued."""
+        cursor = self.conn.cursor()
+        closed = False
+        while not closed:
+            batch = []
+            rows = self._db_q.get()
+            # Fold in batches queued meanwhile so they share a single commit
+            while rows is not None:
+                batch.extend(rows)
+                try:
+                    rows = self._db_q.get_nowait()
+                except queue.Empty:
+                    break
+            closed = rows is None
+
+            if batch:
+                # A failed batch is dropped but the thread keeps serving later ones
+                try:
+                    cursor.execute("BEGIN IMMEDIATE")
+                    self.record_mistakes(batch)
+                    cursor.execute("COMMIT")
+                except sqlite3.Error as e:
+                    if self.conn.in_transaction:
+                        cursor.execute("ROLLBACK")
+                    print(f"Error saving mistakes: {e}")
 
     def get_available_languages(self) -> List[str]:
         """Return a list of available languages for learning."""
@@ -227,130 +417,147 @@ class LanguageLearningBot:
 
     def create_scene_system_prompt(self) -> str:
         """Create a system prompt for the scene based on user preferences."""
-        scene_description = self.SCENES[self.selected_scene]
-
-        system_prompt = f"""
-        You are an AI language tutor helping someone learn {self.target_language}. 
-        Their native language is {self.native_language} and their level is {self.proficiency_level}.
-
-        Scene: {scene_description}
-
-        You will play the role of a native {self.target_language} speaker in this scene.
-
-        Guidelines:
-        1. Primarily use {self.target_language}, but adapt your language complexity to their {self.proficiency_level} level.
-        2. For beginner: Use simple phrases, speak slowly, and provide translations to {self.native_language} when needed.
-        3. For intermediate: Use everyday language, occasionally provide translations for difficult words.
-        4. For advanced: Use natural, native-like speech with occasional challenging vocabulary.
-        5. When the user makes mistakes, gently correct them in your response. When you correct them, format the correction as: [Correction: original mistake → corrected version].
-        6. Track the user's common mistakes and areas for improvement.
-        7. Be patient, encouraging, and make the conversation natural and engaging.
-        8. Start the conversation naturally as if you are in the scene described.
-
-        Begin the conversation in {self.target_language}, introducing yourself according to the scene and asking a question to engage the user.
-        """
-
-        return system_prompt
-
-    def analyze_user_response(self, user_input: str) -> Dict:
-        """Analyze the user's message for mistakes using OpenAI."""
-        prompt = f"""
-        Analyze the following message in {self.target_language} from a {self.proficiency_level} level student:
-
-        "{user_input}"
-
-        Identify any mistakes with grammar, vocabulary, sentence structure, or idioms.
-        For each mistake, provide:
-        1. The incorrect text
-        2. The corrected version
-        3. A brief explanation of the rule or why it's incorrect
-        4. The type of mistake (grammar, vocabulary, structure, idiom, etc.)
-        5. Importance (1-3, where 3 is a critical mistake)
-
-        Format your response as a JSON object like this:
-        {{
-            "mistakes": [
-                {{
-                    "incorrect": "mistake text",
-                    "correction": "corrected text",
-                    "explanation": "brief explanation",
-                    "type": "grammar/vocabulary/etc",
-                    "importance": 2
-                }}
-            ],
-            "overall_quality": 1-5 rating of the response,
-            "strengths": ["strength1", "strength2"],
-            "improvement_areas": ["area1", "area2"]
-        }}
-
-        If there are no mistakes, return an empty array for mistakes.
-        """
-
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
+        return _build_scene_prompt(
+            self.SCENES[self.selected_scene],
+            self.target_language,
+            self.native_language,
+            self.proficiency_level
         )
 
-        try:
-            analysis = json.loads(response.choices[0].message.content)
-            return analysis
-        except Exception as e:
-            print(f"Error parsing analysis response: {e}")
-            return {"mistakes": [], "overall_quality": 3, "strengths": [], "improvement_areas": []}
-
-    def prepare_chat_response(self, user_input: str, analysis: Dict) -> str:
-        """Create an appropriate response to the user based on analysis."""
-        # Create prompt for the language tutor response
-        correction_text = ""
-        for mistake in analysis.get("mistakes", []):
-            if mistake["importance"] >= 2:  # Only correct important mistakes
-                correction_text += f"[Correction: {mistake['incorrect']} → {mistake['correction']}]\n"
-                # Record the mistake in the database
-                self.record_mistake(
-                    mistake_text=mistake["incorrect"],
-                    correction=mistake["correction"],
-                    mistake_type=mistake["type"],
-                    importance=mistake["importance"]
-                )
-
-        # Create prompt for chat response
-        prompt = f"""
-        The user (a {self.proficiency_level} {self.target_language} learner) said:
-        "{user_input}"
+    def get_history_messages(self) -> List[Dict]:
+        """Return the conversation memory as OpenAI chat messages."""
+        roles = {"human": "user", "ai": "assistant", "system": "system"}
+        history = self.memory.load_memory_variables({})["chat_history"]
+        return [{"role": roles[message.type], "content": message.content} for message in history]
+
+    def record_analysis(self, mistakes: List[Mistake]) -> str:
+        """Record the important mistakes of a turn and return their corrections."""
+        corrections = []
+        mistake_rows = []
+        for mistake in mistakes:
+            if mistake.importance >= 2:  # Only correct important mistakes
+                corrections.append(f"[Correction: {mistake.incorrect} → {mistake.correction}]")
+                self.mistakes.append({
+                    "mistake_text": mistake.incorrect,
+                    "correction": mistake.correction,
+                    "mistake_type": mistake.type,
+                    "importance": mistake.importance
+                })
+
+                mistake_rows.append((
+                    self.session_id,
+                    mistake.incorrect,
+                    mistake.correction,
+                    mistake.type,
+                    mistake.importance,
+                    1
+                ))
+
+                # Repeated mistakes are listed once with a count in the summary
+                key = (mistake.incorrect, mistake.correction, mistake.type)
+                entry = self._mistake_counter.get(key)
+                if entry is None:
+                    self._mistake_counter[key] = {**self.mistakes[-1], "count": 1}
+                else:
+                    entry["count"] += 1
+                    entry["importance"] = max(entry["importance"], mistake.importance)
 
-        You are a native {self.target_language} speaker in this scene: {self.SCENES[self.selected_scene]}
+        # Hand the turn's mistakes to the database thread in one batch
+        if mistake_rows:
+            self._db_q.put(mistake_rows)
 
-        Continue the conversation naturally. Respond in {self.target_language} appropriate for their level.
+        return "\n".join(corrections)
 
-        After your response in {self.target_language}, provide these corrections if needed:
-        {correction_text}
+    async def prepare_chat_response(self, user_input: str) -> str:
+        """Continue the scene and analyze the user's message in a single request, streaming the reply.
 
-        Keep your response conversational and appropriate to the scene.
+        Returns the tutor's reply without the corrections, which are only printed.
         """
-
-        response = self.client.chat.completions.create(
+        # run() builds the scene prompt once, build it here when the bot is driven without run()
+        if self._scene_system_prompt is None:
+            self._scene_system_prompt = self.create_scene_system_prompt()
+
+        # Filler messages are answered in plain text, the tools stay in the request so the cached prefix still matches
+        analyze = user_input.strip().strip(".,!?¡¿").strip().lower() not in self.GREETINGS
+        if analyze:
+            tool_choice = {"type": "function", "function": {"name": "tutor_turn"}}
+        else:
+            tool_choice = "none"
+
+        # All instructions live in the static system prompt, only the history and the user's message vary
+        streamed = ""
+        try:
+            async with self.client.beta.chat.completions.stream(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": self._scene_system_prompt},
+                    *self.get_history_messages(),
+                    {"role": "user", "content": user_input}
+                ],
+                tools=[self.TUTOR_TURN_TOOL],
+                tool_choice=tool_choice,
+                temperature=0.7
+            ) as stream:
+                # Print the reply while the function arguments are still arriving
+                async for event in stream:
+                    if event.type == "content.delta":
+                        print(event.delta, end="", flush=True)
+                        streamed += event.delta
+                    elif event.type == "tool_calls.function.arguments.delta":
+                        reply = _partial_reply(event.arguments)
+                        print(reply[len(streamed):], end="", flush=True)
+                        streamed = reply
+
+                completion = await stream.get_final_completion()
+            message = completion.choices[0].message
+        except (LengthFinishReasonError, ContentFilterFinishReasonError) as e:
+            print(f"\nError in tutor response: {e}")
+            message = None
+
+        # The SDK validates the function arguments against TutorTurn
+        if message is not None and message.tool_calls:
+            turn = message.tool_calls[0].function.parsed_arguments
+            bot_response, mistakes = turn.reply, turn.mistakes
+        else:
+            # Plain replies, refusals and cut-off turns keep whatever text arrived and record no mistakes
+            if message is not None:
+                bot_response = message.content or message.refusal or ""
+            else:
+                bot_response = streamed
+            mistakes = []
+
+        # Bound how many corrections a single turn can add to the reply, the memory and the database
+        mistakes = sorted(mistakes, key=lambda m: -m.importance)[:self.MAX_MISTAKES_PER_TURN]
+
+        # Print whatever part of the reply was not streamed, then the corrections
+        print(bot_response[len(streamed):], end="")
+        correction_text = self.record_analysis(mistakes)
+        if correction_text:
+            print("\n\n" + correction_text, end="")
+
+        return bot_response
+
+    async def generate_intro_message(self) -> str:
+        """Open the scene with a message from the tutor."""
+        # Same tools as the conversation turns so the cached prompt prefix is shared with them
+        response = await self.client.chat.completions.create(
             model="gpt-4o",
-            messages=[
-                {"role": "system", "content": self.create_scene_system_prompt()},
-                {"role": "user", "content": prompt}
-            ],
+            messages=[{"role": "system", "content": self._scene_system_prompt}],
+            tools=[self.TUTOR_TURN_TOOL],
+            tool_choice="none",
             temperature=0.7
         )
 
         return response.choices[0].message.content
 
-    def generate_session_feedback(self) -> str:
+    async def generate_session_feedback(self) -> str:
         """Generate comprehensive feedback for the learning session."""
         if not self.mistakes:
             return "Great job! You didn't make any significant mistakes in this conversation."
 
-        # Create a dataframe from the mistakes for analysis
-        df = pd.DataFrame(self.mistakes)
-
         # Prepare data for feedback generation
-        mistake_types = df["mistake_type"].value_counts().to_dict()
-        important_mistakes = df[df["importance"] >= 2].to_dict("records")
+        mistake_types = dict(Counter(m["mistake_type"] for m in self.mistakes).most_common())
+        important_mistakes = [m for m in self.mistakes if m["importance"] >= 2]
 
         # Create the feedback prompt
         prompt = f"""
@@ -372,7 +579,7 @@ class LanguageLearningBot:
         Make the feedback encouraging but constructive.
         """
 
-        response = self.client.chat.completions.create(
+        response = await self.client.chat.completions.create(
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7
@@ -390,21 +597,14 @@ class LanguageLearningBot:
         self.proficiency_level = self.get_proficiency_level()
         self.selected_scene = self.select_scene()
 
+        # The scene prompt is fixed for the session, so build it once and send the same prefix every turn
+        self._scene_system_prompt = self.create_scene_system_prompt()
+
         # Start a new session
         self.session_id = self.start_session()
 
-        # Build the LangChain components with conversation memory
-        system_message = SystemMessage(content=self.create_scene_system_prompt())
-
-        # Create chain for initial message
-        initial_prompt = ChatPromptTemplate.from_messages([system_message])
-        initial_chain = LLMChain(
-            llm=self.chat_model,
-            prompt=initial_prompt
-        )
-
         # Send initial message
-        intro_message = initial_chain.run({})
+        intro_message = self.loop.run_until_complete(self.generate_intro_message())
         print("\n\n" + intro_message + "\n")
 
         # Conversation loop
@@ -417,46 +617,58 @@ class LanguageLearningBot:
                 if user_input.lower() in ["exit", "quit", "bye"]:
                     break
 
-                # Analyze user input for mistakes
-                analysis = self.analyze_user_response(user_input)
-
-                # Generate bot response
-                bot_response = self.prepare_chat_response(user_input, analysis)
-                print("\n" + bot_response + "\n")
+                # Generate bot response (printed as it streams) and analyze user input for mistakes
+                print()
+                bot_response = self.loop.run_until_complete(self.prepare_chat_response(user_input))
+                print("\n")
 
-                # Update conversation memory
-                self.memory.chat_memory.add_user_message(user_input)
-                self.memory.chat_memory.add_ai_message(bot_response)
+                # Update conversation memory (corrections are kept out so they are not replayed to the model)
+                self.memory.save_context({"input": user_input}, {"output": bot_response})
 
         except KeyboardInterrupt:
             print("\nEnding conversation...")
 
+            # Cancel the interrupted turn, otherwise it resumes in the next run_until_complete
+            # (nothing is pending when Ctrl-C hits the prompt, and gather() needs at least one task to pick the loop)
+            pending = asyncio.all_tasks(self.loop)
+            if pending:
+                for task in pending:
+                    task.cancel()
+                self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+
         # End session and provide feedback
         self.end_session()
         print("\n\n--- Session Feedback ---")
-        feedback = self.generate_session_feedback()
+        feedback = self.loop.run_until_complete(self.generate_session_feedback())
         print(feedback)
 
         # Print mistake summary
         if self.mistakes:
             print("\n--- Mistake Summary ---")
-            df = pd.DataFrame(self.mistakes)
 
             # Group mistakes by type
-            mistake_types = df["mistake_type"].value_counts()
+            mistake_types = Counter(m["mistake_type"] for m in self.mistakes)
             print("\nMistake Types:")
-            for mistake_type, count in mistake_types.items():
+            for mistake_type, count in mistake_types.most_common():
                 print(f"- {mistake_type}: {count}")
 
             # Show the most important mistakes
-            important_mistakes = df[df["importance"] >= 2].sort_values("importance", ascending=False)
-            if len(important_mistakes) > 0:
+            important_mistakes = sorted(
+                (m for m in self._mistake_counter.values() if m["importance"] >= 2),
+                key=lambda m: (-m["importance"], -m["count"])
+            )
+            if important_mistakes:
                 print("\nTop Mistakes to Focus On:")
-                for _, row in important_mistakes.iterrows():
-                    print(f"- {row['mistake_text']} → {row['correction']} ({row['mistake_type']})")
+                for mistake in important_mistakes:
+                    repeated = f", x{mistake['count']}" if mistake["count"] > 1 else ""
+                    print(f"- {mistake['mistake_text']} → {mistake['correction']} ({mistake['mistake_type']}{repeated})")
 
         print("\nThank you for practicing with the Language Learning Bot!")
 
+        # Release pooled connections and the event loop
+        self.loop.run_until_complete(self.client.close())
+        self.loop.close()
+
 
 if __name__ == "__main__":
     # Create and run the bot